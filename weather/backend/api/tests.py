@@ -1,3 +1,447 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import csv
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
 
-# Create your tests here.
+import aiohttp
+from django.test import RequestFactory, SimpleTestCase
+
+import weather_core
+from api import views
+from weather_core import (
+    AccuWeatherClient,
+    CoordCache,
+    OpenMeteoClient,
+    ProviderError,
+    WeatherReading,
+    fetch_many,
+    parse_coords,
+    parse_coords_file,
+    to_serializable,
+)
+
+
+def _response(payload, status_code=200):
+    return mock.Mock(status_code=status_code, content=json.dumps(payload).encode("utf-8"))
+
+
+def _location(lat):
+    # Temperature echoes the latitude so readings can be matched to requests
+    return {"current": {"temperature_2m": lat, "relative_humidity_2m": 50}}
+
+
+def _batch_session():
+    """Fake requests.Session answering Open-Meteo multi-location queries."""
+
+    def get(url, params=None, timeout=None):
+        lats = [float(v) for v in str(params["latitude"]).split(",")]
+        if len(lats) == 1:
+            return _response(_location(lats[0]))
+        return _response([_location(lat) for lat in lats])
+
+    return mock.Mock(get=mock.Mock(side_effect=get))
+
+
+def _reading(lat, lon, raw=None):
+    return WeatherReading(
+        provider="openmeteo",
+        latitude=lat,
+        longitude=lon,
+        observed_at_unix=None,
+        temperature_c=10.5,
+        temperature_f=50.9,
+        humidity_pct=40,
+        pressure_hpa=1012.0,
+        wind_speed_ms=3.2,
+        wind_direction_deg=180,
+        condition_code="800",
+        condition_text="clear sky",
+        raw=raw or {},
+    )
+
+
+class CoordCacheTests(SimpleTestCase):
+    def test_keys_round_to_two_decimals(self):
+        cache = CoordCache(ttl=60)
+        cache.set(37.77491, -122.41942, "sf")
+
+        self.assertEqual(cache.get(37.7749, -122.4194), "sf")
+        self.assertIsNone(cache.get(37.78, -122.4194))
+
+    def test_zero_ttl_disables(self):
+        cache = CoordCache(ttl=0)
+        cache.set(1.0, 2.0, "x")
+
+        self.assertIsNone(cache.get(1.0, 2.0))
+
+    def test_hits_are_restamped_with_requested_coords(self):
+        session = _batch_session()
+        client = OpenMeteoClient(session=session)
+        client.cache = CoordCache(ttl=60)
+
+        first = client.fetch_current(1.001, 2.004)
+        second = client.fetch_current(1.004, 2.001)
+
+        session.get.assert_called_once()
+        self.assertEqual((first.latitude, first.longitude), (1.001, 2.004))
+        self.assertEqual((second.latitude, second.longitude), (1.004, 2.001))
+        self.assertEqual(second.temperature_c, first.temperature_c)
+
+
+class GetJsonAsyncTests(SimpleTestCase):
+    def _get(self, *results):
+        """Run _get_json_async against canned (status, headers, body) results; return (value, sleeps)."""
+        get_async = mock.AsyncMock(side_effect=results)
+        sleep = mock.AsyncMock()
+        session = mock.Mock(spec=aiohttp.ClientSession)
+        with mock.patch.object(weather_core, "_get_async", get_async), mock.patch("asyncio.sleep", sleep):
+            value = asyncio.run(weather_core._get_json_async(session, "https://example.test/", {}, "Test error"))
+        self.assertEqual(get_async.await_count, len(results))
+        return value, [c.args[0] for c in sleep.await_args_list]
+
+    def test_retries_transient_status_with_backoff(self):
+        value, sleeps = self._get((503, {}, b""), (502, {}, b""), (200, {}, b'{"ok": true}'))
+
+        self.assertEqual(value, {"ok": True})
+        self.assertEqual(sleeps, [0.25, 0.5])
+
+    def test_retries_dropped_connection(self):
+        value, sleeps = self._get(aiohttp.ServerDisconnectedError(), (200, {}, b"[]"))
+
+        self.assertEqual(value, [])
+        self.assertEqual(sleeps, [0.25])
+
+    def test_honours_capped_retry_after(self):
+        value, sleeps = self._get((429, {"Retry-After": "2"}, b""), (429, {"Retry-After": "3600"}, b""), (200, {}, b"1"))
+
+        self.assertEqual(value, 1)
+        self.assertEqual(sleeps, [2.0, weather_core._MAX_RETRY_AFTER_SECONDS])
+
+    def test_gives_up_after_retries(self):
+        results = [(500, {}, b"oops")] * (weather_core._ASYNC_RETRIES + 1)
+
+        with self.assertRaisesMessage(ProviderError, "Test error 500: oops"):
+            self._get(*results)
+
+    def test_client_error_is_not_retried(self):
+        with self.assertRaisesMessage(ProviderError, "Test error 404"):
+            self._get((404, {}, b"not found"))
+
+
+class BuildSessionTests(SimpleTestCase):
+    def test_retry_after_is_capped(self):
+        retry = weather_core.build_session().get_adapter("https://api.open-meteo.com/").max_retries
+
+        for header, expected in (("3600", weather_core._MAX_RETRY_AFTER_SECONDS), ("2", 2)):
+            with self.subTest(header=header):
+                response = mock.Mock(headers={"Retry-After": header})
+                self.assertEqual(retry.get_retry_after(response), expected)
+        self.assertIsInstance(retry.new(), type(retry))
+
+
+class FetchCurrentBatchTests(SimpleTestCase):
+    def test_chunks_requests_and_keeps_input_order(self):
+        session = _batch_session()
+        client = OpenMeteoClient(session=session)
+        coords = [(float(i), float(i)) for i in range(5)]
+
+        with mock.patch.object(weather_core, "OPENMETEO_BATCH_SIZE", 2):
+            readings = client.fetch_current_batch(coords)
+
+        self.assertEqual(session.get.call_count, 3)
+        self.assertEqual([r.latitude for r in readings], [c[0] for c in coords])
+        self.assertEqual([r.temperature_c for r in readings], [c[0] for c in coords])
+
+    def test_single_object_response(self):
+        client = OpenMeteoClient(session=_batch_session())
+
+        readings = client.fetch_current_batch([(12.5, 3.0)])
+
+        self.assertEqual(len(readings), 1)
+        self.assertEqual(readings[0].temperature_c, 12.5)
+
+    def test_only_cache_misses_are_requested(self):
+        session = _batch_session()
+        client = OpenMeteoClient(session=session)
+        client.fetch_current_batch([(1.0, 1.0)])
+        session.get.reset_mock()
+
+        readings = client.fetch_current_batch([(1.0, 1.0), (2.0, 2.0), (1.0, 1.0)])
+
+        session.get.assert_called_once()
+        self.assertEqual(session.get.call_args.kwargs["params"]["latitude"], "2.0")
+        self.assertEqual([r.latitude for r in readings], [1.0, 2.0, 1.0])
+
+    def test_location_count_mismatch_raises(self):
+        session = mock.Mock(get=mock.Mock(return_value=_response([_location(1.0)])))
+        client = OpenMeteoClient(session=session)
+
+        with self.assertRaises(ProviderError):
+            client.fetch_current_batch([(1.0, 1.0), (2.0, 2.0)])
+
+
+class AccuWeatherParsingTests(SimpleTestCase):
+    def setUp(self):
+        with mock.patch.object(weather_core, "_open_disk_cache", return_value=None):
+            self.client = AccuWeatherClient(api_key="test", session=mock.Mock())
+
+    def test_full_payload(self):
+        payload = {
+            "EpochTime": 1700000000,
+            "Temperature": {"Metric": {"Value": 21.5}, "Imperial": {"Value": 70.7}},
+            "RelativeHumidity": 55,
+            "Pressure": {"Metric": {"Value": 1013.2}},
+            "Wind": {"Speed": {"Metric": {"Value": 36.0}}, "Direction": {"Degrees": 270}},
+            "WeatherText": "Sunny",
+            "WeatherIcon": 1,
+        }
+
+        reading = self.client._to_reading(1.0, 2.0, [payload])
+
+        self.assertEqual(reading.observed_at_unix, 1700000000)
+        self.assertEqual((reading.temperature_c, reading.temperature_f), (21.5, 70.7))
+        self.assertEqual((reading.humidity_pct, reading.pressure_hpa), (55, 1013.2))
+        self.assertEqual((reading.wind_speed_ms, reading.wind_direction_deg), (10.0, 270))
+        self.assertEqual((reading.condition_code, reading.condition_text), ("1", "Sunny"))
+
+    def test_missing_or_malformed_levels_become_none(self):
+        for payload in ({}, {"Temperature": "n/a"}, {"Wind": {"Speed": 5}}, {"Pressure": {"Metric": None}}):
+            with self.subTest(payload=payload):
+                reading = self.client._to_reading(1.0, 2.0, [payload])
+
+                self.assertIsNone(reading.temperature_c)
+                self.assertIsNone(reading.temperature_f)
+                self.assertIsNone(reading.pressure_hpa)
+                self.assertIsNone(reading.wind_speed_ms)
+
+    def test_empty_response(self):
+        reading = self.client._to_reading(1.0, 2.0, [])
+
+        self.assertEqual((reading.latitude, reading.longitude), (1.0, 2.0))
+        self.assertIsNone(reading.temperature_c)
+
+
+class LocationKeyDiskCacheTests(SimpleTestCase):
+    def _client(self, store):
+        session = mock.Mock(get=mock.Mock(return_value=_response({"Key": "349727"})))
+        with mock.patch.object(weather_core, "_open_disk_cache", return_value=store):
+            return AccuWeatherClient(api_key="test", session=session)
+
+    def test_disk_hit_skips_geoposition_lookup(self):
+        store = {"37.77,-122.42": "347629"}
+        client = self._client(store)
+
+        self.assertEqual(client._geoposition_to_location_key(37.7749, -122.4194), "347629")
+        client.session.get.assert_not_called()
+
+    def test_miss_is_written_to_disk_on_the_shared_grid(self):
+        store = mock.Mock(get=mock.Mock(return_value=None))
+        client = self._client(store)
+
+        self.assertEqual(client._geoposition_to_location_key(37.7749, -122.4194), "349727")
+        store.set.assert_called_once_with(
+            "37.77,-122.42", "349727", expire=weather_core.LOCATION_KEY_DISK_TTL_SECONDS
+        )
+
+    def test_store_errors_fall_back_to_lookup(self):
+        error = sqlite3.OperationalError("database is locked")
+        store = mock.Mock(get=mock.Mock(side_effect=error), set=mock.Mock(side_effect=error))
+        client = self._client(store)
+
+        self.assertEqual(client._geoposition_to_location_key(1.0, 2.0), "349727")
+        self.assertEqual(client._geoposition_to_location_key(1.0, 2.0), "349727")
+        client.session.get.assert_called_once()
+
+    @unittest.skipIf(weather_core.diskcache is None, "diskcache not installed")
+    def test_unusable_cache_dir_disables_store(self):
+        with tempfile.NamedTemporaryFile() as not_a_dir:
+            with mock.patch.object(weather_core, "CACHE_DIR", not_a_dir.name):
+                self.assertIsNone(weather_core._open_disk_cache("accu_locations"))
+
+
+class FetchManyTests(SimpleTestCase):
+    def _client(self, fail_on=None):
+        client = mock.Mock(spec=["fetch_current", "fetch_current_async"])
+        client.fetch_current.side_effect = lambda lat, lon: _reading(lat, lon)
+
+        async def fetch_current_async(session, lat, lon):
+            if (lat, lon) == fail_on:
+                raise ProviderError("boom")
+            return _reading(lat, lon)
+
+        client.fetch_current_async = mock.Mock(side_effect=fetch_current_async)
+        return client
+
+    def test_duplicates_are_fetched_once(self):
+        client = self._client()
+
+        readings = fetch_many(client, [(1.0, 2.0), (3.0, 4.0), (1.0, 2.0)])
+
+        self.assertEqual(client.fetch_current_async.call_count, 2)
+        self.assertEqual([(r.latitude, r.longitude) for r in readings], [(1.0, 2.0), (3.0, 4.0), (1.0, 2.0)])
+
+    def test_single_unique_coord_uses_blocking_fetch(self):
+        client = self._client()
+
+        readings = fetch_many(client, [(1.0, 2.0), (1.0, 2.0)])
+
+        client.fetch_current.assert_called_once_with(1.0, 2.0)
+        client.fetch_current_async.assert_not_called()
+        self.assertEqual(len(readings), 2)
+
+    def test_provider_error_is_raised(self):
+        client = self._client(fail_on=(3.0, 4.0))
+
+        with self.assertRaisesMessage(ProviderError, "boom"):
+            fetch_many(client, [(1.0, 2.0), (3.0, 4.0)])
+
+    def test_rejects_concurrency_below_one(self):
+        with self.assertRaises(ValueError):
+            fetch_many(self._client(), [(1.0, 2.0), (3.0, 4.0)], concurrency=0)
+
+
+class ParseCoordsTests(SimpleTestCase):
+    def _python_path(self):
+        return mock.patch.object(weather_core, "_numpy", return_value=None)
+
+    def test_parses_pairs(self):
+        self.assertEqual(parse_coords(["37.5,-122.25", " 1 , 2 "]), [(37.5, -122.25), (1.0, 2.0)])
+
+    def test_out_of_range_is_rejected(self):
+        for bad in ("91,0", "0,-181", "nan,0", "0,nan"):
+            with self.subTest(bad=bad), self.assertRaisesMessage(ValueError, "out of range"):
+                parse_coords(["1,2", bad])
+
+    def test_malformed_pair_is_rejected(self):
+        with self.assertRaisesMessage(ValueError, "Expected 'lat,lon'"):
+            parse_coords(["1,2", "1,2,3"])
+
+    def test_coords_file_range_and_comments(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            good = os.path.join(tmp, "good.txt")
+            bad = os.path.join(tmp, "bad.txt")
+            with open(good, "w", encoding="utf-8") as f:
+                f.write("# header\n1.5,2\n\n3,4 # inline\n")
+            with open(bad, "w", encoding="utf-8") as f:
+                f.write("1,2\n999,999\n")
+
+            for use_numpy in (True, False):
+                patch = contextlib.nullcontext() if use_numpy else self._python_path()
+                with self.subTest(numpy=use_numpy), patch:
+                    self.assertEqual(parse_coords_file(good), [(1.5, 2.0), (3.0, 4.0)])
+                    with self.assertRaisesMessage(ValueError, "out of range"):
+                        parse_coords_file(bad)
+
+
+class KeepRawTests(SimpleTestCase):
+    def test_raw_payload_is_dropped_by_default(self):
+        reading = OpenMeteoClient(session=_batch_session(), keep_raw=False).fetch_current(1.0, 2.0)
+
+        self.assertEqual(reading.raw, {})
+        self.assertNotIn("raw", to_serializable(reading))
+
+    def test_keep_raw_retains_payload(self):
+        reading = OpenMeteoClient(session=_batch_session(), keep_raw=True).fetch_current(1.0, 2.0)
+
+        self.assertEqual(reading.raw, _location(1.0))
+        self.assertEqual(to_serializable(reading)["raw"], _location(1.0))
+
+    def test_flag_overrides_environment_default(self):
+        for default in (False, True):
+            with self.subTest(default=default), mock.patch.object(weather_core, "KEEP_RAW_DEFAULT", default):
+                parser = weather_core.build_arg_parser()
+                base = ["--provider", "openmeteo"]
+
+                self.assertIs(parser.parse_args(base).keep_raw, default)
+                self.assertIs(parser.parse_args(base + ["--keep-raw"]).keep_raw, True)
+                self.assertIs(parser.parse_args(base + ["--no-keep-raw"]).keep_raw, False)
+
+
+class ToSerializableTests(SimpleTestCase):
+    def test_fields_in_declaration_order(self):
+        reading = _reading(1.0, 2.0, raw={"a": 1})
+
+        record = to_serializable(reading)
+
+        self.assertEqual(list(record), list(WeatherReading._fields))
+        self.assertEqual(record, dict(zip(WeatherReading._fields, reading)))
+
+    def test_empty_raw_is_omitted(self):
+        record = to_serializable(_reading(1.0, 2.0))
+
+        self.assertEqual(list(record), list(WeatherReading._fields[:-1]))
+
+
+class WriteCsvTests(SimpleTestCase):
+    def test_rows_follow_header_and_skip_raw(self):
+        readings = [_reading(1.0, 2.0, raw={"x": 1}), _reading(3.0, -4.5)._replace(temperature_c=None)]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "out.csv")
+            weather_core.write_output(readings, "csv", path)
+            with open(path, newline="", encoding="utf-8") as f:
+                rows = list(csv.reader(f))
+
+        self.assertEqual(rows[0], list(weather_core._CSV_FIELDS))
+        self.assertNotIn("raw", rows[0])
+        self.assertEqual(rows[1], ["openmeteo", "1.0", "2.0", "", "10.5", "50.9", "40", "1012.0", "3.2", "180", "800", "clear sky"])
+        self.assertEqual(rows[2][1:5], ["3.0", "-4.5", "", ""])
+        self.assertEqual(len(rows), 3)
+
+
+class WriteJsonTests(SimpleTestCase):
+    def test_matches_stdlib_indented_dump(self):
+        readings = [
+            _reading(1.0, 2.0, raw={"current": {"temp": [1, 2, {"x": None}]}, "units": "metric"}),
+            _reading(3.0, -4.5),
+        ]
+        dest = io.StringIO()
+
+        weather_core._write_json(readings, dest)
+
+        expected = json.dumps([to_serializable(r) for r in readings], indent=2)
+        self.assertEqual(dest.getvalue(), expected + "\n")
+
+    def test_empty(self):
+        dest = io.StringIO()
+
+        weather_core._write_json([], dest)
+
+        self.assertEqual(dest.getvalue(), json.dumps([], indent=2) + "\n")
+
+
+class WarmUpTests(SimpleTestCase):
+    def test_import_does_not_warm(self):
+        self.assertEqual(views._CLIENTS, {})
+        self.assertEqual(weather_core._SHARED_SESSIONS, {})
+
+    def test_first_request_warms_clients(self):
+        request = RequestFactory().get("/weather", {"coords": "1,2"})
+        with mock.patch.dict(views._CLIENTS, clear=True), \
+                mock.patch.object(views, "PRECONNECT", True), \
+                mock.patch.object(views, "_warm_clients") as warm, \
+                mock.patch.object(views, "_get_client", return_value=mock.Mock()), \
+                mock.patch.object(views, "fetch_many", return_value=[_reading(1.0, 2.0)]):
+            self.assertEqual(views.weather(request).status_code, 200)
+            warm.assert_called_once_with()
+
+            views._CLIENTS["openmeteo"] = mock.Mock()
+            self.assertEqual(views.weather(request).status_code, 200)
+            warm.assert_called_once_with()
+
+    def test_fork_child_drops_inherited_state(self):
+        with mock.patch.dict(weather_core._SHARED_SESSIONS, {"example.test": mock.Mock()}), \
+                mock.patch.object(weather_core, "_ASYNC_RUNNER", mock.Mock()), \
+                mock.patch.dict(views._CLIENTS, {"openmeteo": mock.Mock()}):
+            weather_core._reset_after_fork()
+            views._reset_after_fork()
+
+            self.assertEqual(weather_core._SHARED_SESSIONS, {})
+            self.assertIsNone(weather_core._ASYNC_RUNNER)
+            self.assertEqual(views._CLIENTS, {})
@@ -2,35 +2,73 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 
-from pathlib import Path
-import sys
 import os
+import threading
 
-# Reuse provider clients from the CLI module
-BASE_DIR = Path(__file__).resolve().parents[2]
-CLI_PATH = BASE_DIR / "weather_cli.py"
-if str(BASE_DIR) not in sys.path:
-    sys.path.insert(0, str(BASE_DIR))
-
-try:
-    from weather_cli import (
-        OpenWeatherClient,
-        AccuWeatherClient,
-        WeatherAPIClient,
-        OpenMeteoClient,
-        parse_coords,
-        to_serializable,
-        ProviderError,
-    )
-except Exception:  # pragma: no cover
-    OpenWeatherClient = AccuWeatherClient = WeatherAPIClient = OpenMeteoClient = None
-    parse_coords = to_serializable = None
-    class ProviderError(Exception):
-        pass
+from weather_core import (
+    OpenWeatherClient,
+    AccuWeatherClient,
+    WeatherAPIClient,
+    OpenMeteoClient,
+    PRECONNECT,
+    fetch_many,
+    parse_coords,
+    to_serializable,
+    ProviderError,
+)
+
+
+# Clients are built once per provider and reused, keeping their TTL caches and
+# pooled requests sessions (single-coord fetches) across requests. Multi-coord
+# fetches share weather_core's process-wide async session instead.
+_CLIENT_FACTORIES = {
+    "openweather": lambda: OpenWeatherClient(api_key=os.getenv("OPENWEATHER_API_KEY", "")),
+    "accuweather": lambda: AccuWeatherClient(api_key=os.getenv("ACCUWEATHER_API_KEY", "")),
+    "weatherapi": lambda: WeatherAPIClient(api_key=os.getenv("WEATHERAPI_API_KEY", "")),
+    "openmeteo": lambda: OpenMeteoClient(),
+}
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def _get_client(provider):
+    client = _CLIENTS.get(provider)
+    if client is None:
+        with _CLIENTS_LOCK:
+            client = _CLIENTS.get(provider)
+            if client is None:
+                client = _CLIENTS[provider] = _CLIENT_FACTORIES[provider]()
+    return client
+
+
+def _warm_clients():
+    """Build every provider's client so their sessions start connecting.
+
+    Called on the first request rather than at import, so management commands
+    stay offline and each forked worker warms its own connections.
+    """
+    for provider in _CLIENT_FACTORIES:
+        try:
+            _get_client(provider)
+        except ProviderError:
+            pass  # API key not configured; retried on first use
+
+
+def _reset_after_fork():
+    # Forked workers rebuild their clients instead of sharing the parent's sockets
+    global _CLIENTS_LOCK
+    _CLIENTS.clear()
+    _CLIENTS_LOCK = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
 
 
 @api_view(["GET"])
 def weather(request):
+    if PRECONNECT and not _CLIENTS:
+        _warm_clients()
     provider = request.query_params.get("provider", "openmeteo").lower()
     coords_param = request.query_params.getlist("coords") or request.query_params.get("coords", "")
     if isinstance(coords_param, str):
@@ -44,18 +82,10 @@ def weather(request):
         return Response({"error": f"invalid coords: {e}"}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        if provider == "openweather":
-            client = OpenWeatherClient(api_key=os.getenv("OPENWEATHER_API_KEY", ""))
-        elif provider == "accuweather":
-            client = AccuWeatherClient(api_key=os.getenv("ACCUWEATHER_API_KEY", ""))
-        elif provider == "weatherapi":
-            client = WeatherAPIClient(api_key=os.getenv("WEATHERAPI_API_KEY", ""))
-        elif provider == "openmeteo":
-            client = OpenMeteoClient()
-        else:
+        if provider not in _CLIENT_FACTORIES:
             return Response({"error": "unsupported provider"}, status=status.HTTP_400_BAD_REQUEST)
-
-        readings = [to_serializable(client.fetch_current(lat, lon)) for (lat, lon) in coords]
+        client = _get_client(provider)
+        readings = [to_serializable(r) for r in fetch_many(client, coords)]
         return Response(readings)
     except ProviderError as e:
         return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
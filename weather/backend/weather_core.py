@@ -0,0 +1,1144 @@
+#!/usr/bin/env python3
+"""
+Weather data downloader for given coordinates.
+
+Supports providers:
+- openweather: Current weather by lat/lon using OpenWeather Current Weather API
+- accuweather: Current conditions via AccuWeather (geoposition -> location key -> conditions)
+- weatherapi: Current weather using WeatherAPI.com current.json endpoint
+- openmeteo: Current weather using Open-Meteo free API (no key)
+
+API Keys (env vars or CLI flags):
+- OPENWEATHER_API_KEY
+- ACCUWEATHER_API_KEY
+- WEATHERAPI_API_KEY
+
+Examples:
+  python3 weather_cli.py --provider openweather --coords 37.7749,-122.4194 40.7128,-74.0060 --out results.json
+  python3 weather_cli.py --provider accuweather --coords 51.5074,-0.1278 --format csv --out london.csv
+  python3 weather_cli.py --provider openmeteo --coords 37.7749,-122.4194
+"""
+
+import argparse
+import asyncio
+import atexit
+import csv
+import functools
+import json
+import operator
+import os
+import sqlite3
+import sys
+import threading
+import time
+import warnings
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import aiohttp
+import requests
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:  # optional: faster JSON decoding/encoding
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:  # optional: persist AccuWeather location keys across runs
+    import diskcache
+except ImportError:  # pragma: no cover
+    diskcache = None
+
+# Failures from an unusable on-disk cache; these are treated as cache misses
+_DISK_CACHE_ERRORS: Tuple[type, ...] = (OSError, sqlite3.Error)
+if diskcache is not None:
+    _DISK_CACHE_ERRORS += (diskcache.Timeout,)
+
+
+DEFAULT_SAMPLE_COORDS: List[Tuple[float, float]] = [
+    (37.7749, -122.4194),  # San Francisco
+    (40.7128, -74.0060),   # New York
+    (51.5074, -0.1278),    # London
+]
+
+# Provider payloads are dropped from readings unless WEATHER_KEEP_RAW=1 (or --keep-raw)
+KEEP_RAW_DEFAULT = os.getenv("WEATHER_KEEP_RAW", "") == "1"
+
+# Max coordinate pairs per Open-Meteo multi-location request (keeps URLs short)
+OPENMETEO_BATCH_SIZE = 100
+
+# Shared read-only fallback for chained lookups into nested payloads (see _sub)
+_EMPTY: Dict[str, Any] = {}
+
+# Upper bound on in-flight provider requests when fetching many coords at once
+DEFAULT_CONCURRENCY = 8
+
+_ASYNC_TIMEOUT = aiohttp.ClientTimeout(total=20)
+# Multiplex concurrent requests over HTTP/2 with httpx instead of aiohttp (needs httpx[http2])
+HTTP2 = os.getenv("WEATHER_HTTP2", "") == "1"
+
+if TYPE_CHECKING:  # pragma: no cover
+    import httpx  # optional; imported at runtime only when WEATHER_HTTP2=1
+
+AsyncSession = Union[aiohttp.ClientSession, "httpx.AsyncClient"]
+
+# Retry policy shared by build_session's urllib3 Retry and the async fetches
+_ASYNC_RETRIES = 3
+_ASYNC_BACKOFF_SECONDS = 0.25
+_MAX_RETRY_AFTER_SECONDS = 20.0
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Long-lived loop + async session used by fetch_many (see _AsyncRunner)
+_ASYNC_RUNNER: Optional["_AsyncRunner"] = None
+_ASYNC_RUNNER_LOCK = threading.Lock()
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        warnings.warn(f"Ignoring invalid {name}={raw!r}; using {default}", RuntimeWarning, stacklevel=2)
+        return default
+
+
+# Seconds a reading is reused for the same ~1 km grid cell (WEATHER_CACHE_TTL=0 disables)
+CACHE_TTL_SECONDS = _env_float("WEATHER_CACHE_TTL", 300.0)
+# AccuWeather location keys for a coordinate practically never change
+LOCATION_KEY_TTL_SECONDS = 86400
+# On-disk copy of the location keys (needs diskcache), shared across runs and processes
+LOCATION_KEY_DISK_TTL_SECONDS = 30 * 86400
+CACHE_DIR = os.path.expanduser(os.getenv("WEATHER_CACHE_DIR", "~/.cache/weather_cli"))
+
+# One pooled keep-alive session per provider host, shared by every client in the process
+_SHARED_SESSIONS: Dict[str, requests.Session] = {}
+_SHARED_SESSIONS_LOCK = threading.Lock()
+# Warm new shared sessions in the background (WEATHER_PRECONNECT=0 disables)
+PRECONNECT = os.getenv("WEATHER_PRECONNECT", "1") != "0"
+
+
+class ProviderError(Exception):
+    pass
+
+
+class WeatherReading(NamedTuple):
+    provider: str
+    latitude: float
+    longitude: float
+    observed_at_unix: Optional[int]
+    temperature_c: Optional[float]
+    temperature_f: Optional[float]
+    humidity_pct: Optional[int]
+    pressure_hpa: Optional[float]
+    wind_speed_ms: Optional[float]
+    wind_direction_deg: Optional[int]
+    condition_code: Optional[str]
+    condition_text: Optional[str]
+    raw: Dict[str, Any]
+
+
+class _CappedRetry(Retry):
+    """urllib3 Retry that waits at most ``_MAX_RETRY_AFTER_SECONDS`` for Retry-After."""
+
+    def parse_retry_after(self, retry_after: str) -> float:
+        return min(super().parse_retry_after(retry_after), _MAX_RETRY_AFTER_SECONDS)
+
+
+def build_session() -> requests.Session:
+    """Create a keep-alive session with a larger pool and retries on transient errors."""
+    retry = _CappedRetry(
+        total=3,
+        backoff_factor=0.25,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.headers["Connection"] = "keep-alive"
+    session.headers["Accept-Encoding"] = "gzip"
+    return session
+
+
+def shared_session(host: str) -> requests.Session:
+    """Return the process-wide session for a provider host, creating it on first use.
+
+    A new session is warmed in the background (see ``preconnect``).
+    """
+    with _SHARED_SESSIONS_LOCK:
+        session = _SHARED_SESSIONS.get(host)
+        if session is None:
+            session = _SHARED_SESSIONS[host] = build_session()
+            if PRECONNECT:
+                preconnect(session, host)
+        return session
+
+
+def preconnect(session: requests.Session, host: str) -> None:
+    """Open keep-alive connections to ``host`` in the background.
+
+    Both transports are warmed: ``session`` (single-coord fetches) on a daemon
+    thread and the process-wide async session used by fetch_many's fan-out.
+    DNS lookup and the TLS handshake then overlap with argument parsing and
+    client setup instead of delaying the first real request.
+    """
+    url = f"https://{host}/"
+
+    def warm() -> None:
+        try:
+            session.head(url, timeout=5)
+        except requests.RequestException:
+            pass
+
+    threading.Thread(target=warm, name=f"preconnect-{host}", daemon=True).start()
+    _async_runner().submit(lambda async_session: _head_async(async_session, url))
+
+
+def _reset_after_fork() -> None:
+    # A forked child (e.g. a gunicorn --preload worker) must not share the
+    # parent's pooled sockets, and the parent's loop thread does not exist here
+    global _SHARED_SESSIONS_LOCK, _ASYNC_RUNNER, _ASYNC_RUNNER_LOCK
+    _SHARED_SESSIONS.clear()
+    _SHARED_SESSIONS_LOCK = threading.Lock()
+    _ASYNC_RUNNER = None
+    _ASYNC_RUNNER_LOCK = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+async def _head_async(session: AsyncSession, url: str) -> None:
+    try:
+        if isinstance(session, aiohttp.ClientSession):
+            async with session.head(url, timeout=aiohttp.ClientTimeout(total=5)):
+                pass
+        else:
+            await session.head(url, timeout=5)
+    except Exception:  # best effort: the real request reports any failure
+        pass
+
+
+class CoordCache:
+    """Thread-safe TTL cache keyed on coordinates rounded to two decimals (~1 km)."""
+
+    def __init__(self, ttl: float, maxsize: int = 4096) -> None:
+        self.enabled = ttl > 0
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl if self.enabled else 1)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(latitude: float, longitude: float) -> Tuple[float, float]:
+        return (round(latitude, 2), round(longitude, 2))
+
+    def get(self, latitude: float, longitude: float) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            return self._cache.get(self._key(latitude, longitude))
+
+    def set(self, latitude: float, longitude: float, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._cache[self._key(latitude, longitude)] = value
+
+
+def _open_disk_cache(name: str) -> Optional[Any]:
+    """Open a persistent cache under CACHE_DIR, or None if diskcache is missing or the dir is unusable."""
+    if diskcache is None:
+        return None
+    try:
+        return diskcache.Cache(os.path.join(CACHE_DIR, name))
+    except _DISK_CACHE_ERRORS:
+        return None
+
+
+def _disk_key(latitude: float, longitude: float) -> str:
+    # Same ~1 km grid as the in-memory CoordCache
+    return "{},{}".format(*CoordCache._key(latitude, longitude))
+
+
+def _cached_reading(fetch):
+    """Serve fetch_current from the client's cache, re-stamped with the requested coords."""
+
+    @functools.wraps(fetch)
+    def wrapper(self, latitude: float, longitude: float) -> WeatherReading:
+        hit = self.cache.get(latitude, longitude)
+        if hit is not None:
+            return hit._replace(latitude=latitude, longitude=longitude)
+        reading = fetch(self, latitude, longitude)
+        self.cache.set(latitude, longitude, reading)
+        return reading
+
+    return wrapper
+
+
+def _cached_reading_async(fetch):
+    """Async counterpart of _cached_reading for fetch_current_async."""
+
+    @functools.wraps(fetch)
+    async def wrapper(self, session: AsyncSession, latitude: float, longitude: float) -> WeatherReading:
+        hit = self.cache.get(latitude, longitude)
+        if hit is not None:
+            return hit._replace(latitude=latitude, longitude=longitude)
+        reading = await fetch(self, session, latitude, longitude)
+        self.cache.set(latitude, longitude, reading)
+        return reading
+
+    return wrapper
+
+
+class OpenWeatherClient:
+    """Client for OpenWeather Current Weather Data API.
+
+    Docs: https://openweathermap.org/current
+    Endpoint: https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={API key}&units=metric
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        session: Optional[requests.Session] = None,
+        keep_raw: bool = KEEP_RAW_DEFAULT,
+    ) -> None:
+        if not api_key:
+            raise ProviderError("OpenWeather API key is required")
+        self.api_key = api_key
+        self.session = session or shared_session("api.openweathermap.org")
+        self.keep_raw = keep_raw
+        self.cache = CoordCache(ttl=CACHE_TTL_SECONDS)
+
+    @_cached_reading
+    def fetch_current(self, latitude: float, longitude: float) -> WeatherReading:
+        url = "https://api.openweathermap.org/data/2.5/weather"
+        params = {
+            "lat": latitude,
+            "lon": longitude,
+            "appid": self.api_key,
+            "units": "metric",
+        }
+        data = _get_json(self.session, url, params, "OpenWeather error")
+        return self._to_reading(latitude, longitude, data)
+
+    @_cached_reading_async
+    async def fetch_current_async(
+        self, session: AsyncSession, latitude: float, longitude: float
+    ) -> WeatherReading:
+        url = "https://api.openweathermap.org/data/2.5/weather"
+        params = {
+            "lat": latitude,
+            "lon": longitude,
+            "appid": self.api_key,
+            "units": "metric",
+        }
+        data = await _get_json_async(session, url, params, "OpenWeather error")
+        return self._to_reading(latitude, longitude, data)
+
+    def _to_reading(self, latitude: float, longitude: float, data: Dict[str, Any]) -> WeatherReading:
+        main = data.get("main", {})
+        wind = data.get("wind", {})
+        weather_arr = data.get("weather", []) or [{}]
+        weather0 = weather_arr[0] if weather_arr else {}
+        dt_unix = data.get("dt")
+
+        temp_c = main.get("temp")
+        temp_f = (temp_c * 9 / 5 + 32) if isinstance(temp_c, (int, float)) else None
+        humidity = main.get("humidity")
+        pressure = main.get("pressure")
+        wind_speed = wind.get("speed")
+        wind_deg = wind.get("deg")
+
+        return WeatherReading(
+            provider="openweather",
+            latitude=latitude,
+            longitude=longitude,
+            observed_at_unix=dt_unix,
+            temperature_c=_ensure_float(temp_c),
+            temperature_f=_ensure_float(temp_f),
+            humidity_pct=_ensure_int(humidity),
+            pressure_hpa=_ensure_float(pressure),
+            wind_speed_ms=_ensure_float(wind_speed),
+            wind_direction_deg=_ensure_int(wind_deg),
+            condition_code=str(weather0.get("id")) if weather0.get("id") is not None else None,
+            condition_text=weather0.get("description"),
+            raw=data if self.keep_raw else {},
+        )
+
+
+class AccuWeatherClient:
+    """Client for AccuWeather free APIs.
+
+    Flow:
+      1) Use Geoposition Search to get location key
+      2) Use Current Conditions API with that key
+
+    Docs:
+      - Geoposition Search: https://developer.accuweather.com/accuweather-locations-api/apis/get/locations/v1/cities/geoposition/search
+      - Current Conditions: https://developer.accuweather.com/accuweather-current-conditions-api/apis/get/currentconditions/v1/%7BlocationKey%7D
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        session: Optional[requests.Session] = None,
+        keep_raw: bool = KEEP_RAW_DEFAULT,
+    ) -> None:
+        if not api_key:
+            raise ProviderError("AccuWeather API key is required")
+        self.api_key = api_key
+        self.session = session or shared_session("dataservice.accuweather.com")
+        self.keep_raw = keep_raw
+        self.cache = CoordCache(ttl=CACHE_TTL_SECONDS)
+        self._location_keys = CoordCache(ttl=LOCATION_KEY_TTL_SECONDS)
+        self._location_store = _open_disk_cache("accu_locations")
+
+    def _cached_location_key(self, latitude: float, longitude: float) -> Optional[str]:
+        cached = self._location_keys.get(latitude, longitude)
+        if cached is None and self._location_store is not None:
+            try:
+                cached = self._location_store.get(_disk_key(latitude, longitude))
+            except _DISK_CACHE_ERRORS:
+                cached = None
+            if cached is not None:
+                self._location_keys.set(latitude, longitude, cached)
+        return cached
+
+    def _remember_location_key(self, latitude: float, longitude: float, location_key: str) -> None:
+        self._location_keys.set(latitude, longitude, location_key)
+        if self._location_store is not None:
+            try:
+                self._location_store.set(
+                    _disk_key(latitude, longitude), location_key, expire=LOCATION_KEY_DISK_TTL_SECONDS
+                )
+            except _DISK_CACHE_ERRORS:
+                pass
+
+    def _geoposition_to_location_key(self, latitude: float, longitude: float) -> str:
+        cached = self._cached_location_key(latitude, longitude)
+        if cached is not None:
+            return cached
+        url = "https://dataservice.accuweather.com/locations/v1/cities/geoposition/search"
+        params = {"apikey": self.api_key, "q": f"{latitude},{longitude}"}
+        payload = _get_json(self.session, url, params, "AccuWeather geoposition error") or {}
+        location_key = payload.get("Key")
+        if not location_key:
+            raise ProviderError("AccuWeather: no location key returned for coordinates")
+        self._remember_location_key(latitude, longitude, str(location_key))
+        return str(location_key)
+
+    async def _geoposition_to_location_key_async(
+        self, session: AsyncSession, latitude: float, longitude: float
+    ) -> str:
+        cached = self._cached_location_key(latitude, longitude)
+        if cached is not None:
+            return cached
+        url = "https://dataservice.accuweather.com/locations/v1/cities/geoposition/search"
+        params = {"apikey": self.api_key, "q": f"{latitude},{longitude}"}
+        payload = await _get_json_async(session, url, params, "AccuWeather geoposition error") or {}
+        location_key = payload.get("Key")
+        if not location_key:
+            raise ProviderError("AccuWeather: no location key returned for coordinates")
+        self._remember_location_key(latitude, longitude, str(location_key))
+        return str(location_key)
+
+    @_cached_reading
+    def fetch_current(self, latitude: float, longitude: float) -> WeatherReading:
+        location_key = self._geoposition_to_location_key(latitude, longitude)
+        url = f"https://dataservice.accuweather.com/currentconditions/v1/{location_key}"
+        params = {"apikey": self.api_key, "details": "true"}
+        arr = _get_json(self.session, url, params, "AccuWeather current conditions error") or []
+        return self._to_reading(latitude, longitude, arr)
+
+    @_cached_reading_async
+    async def fetch_current_async(
+        self, session: AsyncSession, latitude: float, longitude: float
+    ) -> WeatherReading:
+        # The two steps stay sequential per coordinate; coordinates run concurrently
+        location_key = await self._geoposition_to_location_key_async(session, latitude, longitude)
+        url = f"https://dataservice.accuweather.com/currentconditions/v1/{location_key}"
+        params = {"apikey": self.api_key, "details": "true"}
+        arr = await _get_json_async(session, url, params, "AccuWeather current conditions error") or []
+        return self._to_reading(latitude, longitude, arr)
+
+    def _to_reading(self, latitude: float, longitude: float, arr: List[Dict[str, Any]]) -> WeatherReading:
+        data = arr[0] if arr else {}
+
+        epoch_time = data.get("EpochTime")
+        temperature = _sub(data, "Temperature")
+        wind = _sub(data, "Wind")
+        temp_c = _sub(temperature, "Metric").get("Value")
+        temp_f = _sub(temperature, "Imperial").get("Value")
+        humidity = data.get("RelativeHumidity")
+        pressure = _sub(_sub(data, "Pressure"), "Metric").get("Value")
+        wind_speed = _sub(_sub(wind, "Speed"), "Metric").get("Value")
+        wind_deg = _sub(wind, "Direction").get("Degrees")
+        weather_text = data.get("WeatherText")
+        weather_icon = data.get("WeatherIcon")
+
+        return WeatherReading(
+            provider="accuweather",
+            latitude=latitude,
+            longitude=longitude,
+            observed_at_unix=_ensure_int(epoch_time),
+            temperature_c=_ensure_float(temp_c),
+            temperature_f=_ensure_float(temp_f),
+            humidity_pct=_ensure_int(humidity),
+            pressure_hpa=_ensure_float(pressure),
+            wind_speed_ms=_metric_kmh_or_ms_to_ms(wind_speed, unit_hint="kmh"),
+            wind_direction_deg=_ensure_int(wind_deg),
+            condition_code=str(weather_icon) if weather_icon is not None else None,
+            condition_text=weather_text,
+            raw=data if self.keep_raw else {},
+        )
+
+
+class WeatherAPIClient:
+    """Client for WeatherAPI.com current weather.
+
+    Docs: https://www.weatherapi.com/docs/
+    Endpoint: https://api.weatherapi.com/v1/current.json?key=KEY&q=LAT,LON
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        session: Optional[requests.Session] = None,
+        keep_raw: bool = KEEP_RAW_DEFAULT,
+    ) -> None:
+        if not api_key:
+            raise ProviderError("WeatherAPI API key is required")
+        self.api_key = api_key
+        self.session = session or shared_session("api.weatherapi.com")
+        self.keep_raw = keep_raw
+        self.cache = CoordCache(ttl=CACHE_TTL_SECONDS)
+
+    @_cached_reading
+    def fetch_current(self, latitude: float, longitude: float) -> WeatherReading:
+        url = "https://api.weatherapi.com/v1/current.json"
+        params = {"key": self.api_key, "q": f"{latitude},{longitude}"}
+        data = _get_json(self.session, url, params, "WeatherAPI error")
+        return self._to_reading(latitude, longitude, data)
+
+    @_cached_reading_async
+    async def fetch_current_async(
+        self, session: AsyncSession, latitude: float, longitude: float
+    ) -> WeatherReading:
+        url = "https://api.weatherapi.com/v1/current.json"
+        params = {"key": self.api_key, "q": f"{latitude},{longitude}"}
+        data = await _get_json_async(session, url, params, "WeatherAPI error")
+        return self._to_reading(latitude, longitude, data)
+
+    def _to_reading(self, latitude: float, longitude: float, data: Dict[str, Any]) -> WeatherReading:
+        current = data.get("current", {})
+
+        epoch = current.get("last_updated_epoch")
+        temp_c = current.get("temp_c")
+        temp_f = current.get("temp_f")
+        humidity = current.get("humidity")
+        pressure = current.get("pressure_mb")  # millibars ~= hPa
+        wind_kph = current.get("wind_kph")
+        wind_deg = current.get("wind_degree")
+        cond = current.get("condition", {})
+
+        return WeatherReading(
+            provider="weatherapi",
+            latitude=latitude,
+            longitude=longitude,
+            observed_at_unix=_ensure_int(epoch),
+            temperature_c=_ensure_float(temp_c),
+            temperature_f=_ensure_float(temp_f),
+            humidity_pct=_ensure_int(humidity),
+            pressure_hpa=_ensure_float(pressure),
+            wind_speed_ms=_metric_kmh_or_ms_to_ms(wind_kph, unit_hint="kmh"),
+            wind_direction_deg=_ensure_int(wind_deg),
+            condition_code=str(cond.get("code")) if cond.get("code") is not None else None,
+            condition_text=cond.get("text"),
+            raw=data if self.keep_raw else {},
+        )
+
+
+class OpenMeteoClient:
+    """Client for Open-Meteo current weather (no key).
+
+    Docs: https://open-meteo.com/en/docs
+    Example: https://api.open-meteo.com/v1/forecast?latitude=..&longitude=..&current=temperature_2m,relative_humidity_2m,pressure_msl,wind_speed_10m,wind_direction_10m&wind_speed_unit=ms
+    """
+
+    def __init__(self, session: Optional[requests.Session] = None, keep_raw: bool = KEEP_RAW_DEFAULT) -> None:
+        self.session = session or shared_session("api.open-meteo.com")
+        self.keep_raw = keep_raw
+        self.cache = CoordCache(ttl=CACHE_TTL_SECONDS)
+
+    @_cached_reading
+    def fetch_current(self, latitude: float, longitude: float) -> WeatherReading:
+        url = "https://api.open-meteo.com/v1/forecast"
+        params = self._params(latitude, longitude)
+        data = _get_json(self.session, url, params, "Open-Meteo error")
+        return self._to_reading(latitude, longitude, data)
+
+    @_cached_reading_async
+    async def fetch_current_async(
+        self, session: AsyncSession, latitude: float, longitude: float
+    ) -> WeatherReading:
+        url = "https://api.open-meteo.com/v1/forecast"
+        params = self._params(latitude, longitude)
+        data = await _get_json_async(session, url, params, "Open-Meteo error")
+        return self._to_reading(latitude, longitude, data)
+
+    def fetch_current_batch(self, coords: List[Tuple[float, float]]) -> List[WeatherReading]:
+        """Fetch many coordinates with one request per OPENMETEO_BATCH_SIZE pairs.
+
+        Open-Meteo accepts comma-separated latitude/longitude lists and answers
+        with one location object per pair, in request order.
+        """
+        readings: List[Optional[WeatherReading]] = []
+        missing: List[int] = []
+        for idx, (lat, lon) in enumerate(coords):
+            hit = self.cache.get(lat, lon)
+            if hit is None:
+                missing.append(idx)
+                readings.append(None)
+            else:
+                readings.append(hit._replace(latitude=lat, longitude=lon))
+
+        url = "https://api.open-meteo.com/v1/forecast"
+        for start in range(0, len(missing), OPENMETEO_BATCH_SIZE):
+            chunk = missing[start : start + OPENMETEO_BATCH_SIZE]
+            params = self._params(
+                ",".join(str(coords[i][0]) for i in chunk),
+                ",".join(str(coords[i][1]) for i in chunk),
+            )
+            data = _get_json(self.session, url, params, "Open-Meteo error")
+            locations = data if isinstance(data, list) else [data]
+            if len(locations) != len(chunk):
+                raise ProviderError(
+                    f"Open-Meteo returned {len(locations)} locations for {len(chunk)} coordinates"
+                )
+            for idx, location in zip(chunk, locations):
+                lat, lon = coords[idx]
+                reading = self._to_reading(lat, lon, location)
+                self.cache.set(lat, lon, reading)
+                readings[idx] = reading
+        return readings  # type: ignore[return-value]
+
+    @staticmethod
+    def _params(latitude: Any, longitude: Any) -> Dict[str, Any]:
+        return {
+            "latitude": latitude,
+            "longitude": longitude,
+            "current": "temperature_2m,relative_humidity_2m,pressure_msl,wind_speed_10m,wind_direction_10m",
+            "wind_speed_unit": "ms",
+        }
+
+    def _to_reading(self, latitude: float, longitude: float, data: Dict[str, Any]) -> WeatherReading:
+        cur = data.get("current", {})
+
+        temp_c = cur.get("temperature_2m")
+        humidity = cur.get("relative_humidity_2m")
+        pressure = cur.get("pressure_msl")
+        wind_speed_ms = cur.get("wind_speed_10m")
+        wind_deg = cur.get("wind_direction_10m")
+
+        return WeatherReading(
+            provider="openmeteo",
+            latitude=latitude,
+            longitude=longitude,
+            observed_at_unix=None,
+            temperature_c=_ensure_float(temp_c),
+            temperature_f=_c_to_f(temp_c),
+            humidity_pct=_ensure_int(humidity),
+            pressure_hpa=_ensure_float(pressure),
+            wind_speed_ms=_ensure_float(wind_speed_ms),
+            wind_direction_deg=_ensure_int(wind_deg),
+            condition_code=None,
+            condition_text=None,
+            raw=data if self.keep_raw else {},
+        )
+
+
+def _get_json(session: requests.Session, url: str, params: Dict[str, Any], error_prefix: str) -> Any:
+    r = session.get(url, params=params, timeout=20)
+    if r.status_code != 200:
+        raise ProviderError(f"{error_prefix} {r.status_code}: {_body_text(r.content)}")
+    # Decode the bytes directly: response.json()/.text would run charset
+    # detection whenever the provider omits a charset in Content-Type
+    return _json_loads(r.content)
+
+
+async def _get_json_async(
+    session: AsyncSession, url: str, params: Dict[str, Any], error_prefix: str
+) -> Any:
+    # Mirrors build_session's urllib3 Retry: up to _ASYNC_RETRIES retries with
+    # exponential backoff on 429/5xx and dropped connections
+    for attempt in range(_ASYNC_RETRIES + 1):
+        last_attempt = attempt == _ASYNC_RETRIES
+        try:
+            status, headers, body = await _get_async(session, url, params)
+        except _transient_errors(session):
+            if last_attempt:
+                raise
+            delay = _ASYNC_BACKOFF_SECONDS * (2**attempt)
+        else:
+            if status == 200:
+                return _json_loads(body)
+            if status not in _RETRY_STATUSES or last_attempt:
+                raise ProviderError(f"{error_prefix} {status}: {_body_text(body)}")
+            delay = _retry_after(headers) or _ASYNC_BACKOFF_SECONDS * (2**attempt)
+        await asyncio.sleep(delay)
+    raise AssertionError("unreachable")  # pragma: no cover
+
+
+async def _get_async(session: AsyncSession, url: str, params: Dict[str, Any]) -> Tuple[int, Any, bytes]:
+    if isinstance(session, aiohttp.ClientSession):
+        async with session.get(url, params=params, timeout=_ASYNC_TIMEOUT) as r:
+            return r.status, r.headers, await r.read()
+    response = await session.get(url, params=params)
+    return response.status_code, response.headers, response.content
+
+
+def _transient_errors(session: AsyncSession) -> Tuple[type, ...]:
+    if isinstance(session, aiohttp.ClientSession):
+        return (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+    import httpx  # a non-aiohttp session is always an httpx.AsyncClient
+
+    return (httpx.TransportError,)
+
+
+def _retry_after(headers: Any) -> Optional[float]:
+    try:
+        return min(float(headers.get("Retry-After", "")), _MAX_RETRY_AFTER_SECONDS)
+    except ValueError:
+        return None
+
+
+def _body_text(payload: bytes) -> str:
+    # All supported providers send UTF-8
+    return payload.decode("utf-8", errors="replace")
+
+
+def _json_loads(payload: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def _json_dumps_pretty(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(obj, indent=2, sort_keys=False)
+
+
+def _sub(obj: Dict[str, Any], key: str) -> Dict[str, Any]:
+    """Return ``obj[key]`` if it is a dict, else an empty one, so lookups can be chained."""
+    value = obj.get(key)
+    return value if isinstance(value, dict) else _EMPTY
+
+
+def _ensure_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _ensure_int(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _metric_kmh_or_ms_to_ms(value: Any, unit_hint: str = "mps") -> Optional[float]:
+    v = _ensure_float(value)
+    if v is None:
+        return None
+    if unit_hint == "mps":
+        return v
+    return v / 3.6
+
+
+def _c_to_f(value: Any) -> Optional[float]:
+    v = _ensure_float(value)
+    if v is None:
+        return None
+    return v * 9 / 5 + 32
+
+
+@functools.lru_cache(maxsize=None)
+def _numpy() -> Optional[Any]:
+    """Import numpy on first use; it is optional and only pays off for large inputs."""
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover
+        return None
+    return numpy
+
+
+def parse_coords(raw_list: List[str]) -> List[Tuple[float, float]]:
+    coords: List[Tuple[float, float]] = []
+    for item in raw_list:
+        parts = item.split(",")
+        if len(parts) != 2:
+            raise ValueError(f"Invalid coordinate '{item}'. Expected 'lat,lon'.")
+        lat = float(parts[0].strip())
+        lon = float(parts[1].strip())
+        if not _in_range(lat, lon):
+            raise ValueError(_OUT_OF_RANGE.format(item))
+        coords.append((lat, lon))
+    return coords
+
+
+def parse_coords_file(path: str) -> List[Tuple[float, float]]:
+    if _numpy() is not None:
+        return _parse_coords_file_numpy(path)
+    coords: List[Tuple[float, float]] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            # Same rules as np.loadtxt(comments="#"): anything after '#' is ignored
+            s = line.split("#", 1)[0].strip()
+            if not s:
+                continue
+            parts = s.split(",")
+            if len(parts) != 2:
+                raise ValueError(f"Invalid line in coords file: '{line.strip()}'")
+            lat = float(parts[0].strip())
+            lon = float(parts[1].strip())
+            if not _in_range(lat, lon):
+                raise ValueError(_OUT_OF_RANGE.format(s))
+            coords.append((lat, lon))
+    return coords
+
+
+def _parse_coords_file_numpy(path: str) -> List[Tuple[float, float]]:
+    np = _numpy()
+    try:
+        with warnings.catch_warnings():
+            # An empty (or comments-only) file is valid and simply yields no coords
+            warnings.simplefilter("ignore", UserWarning)
+            arr = np.loadtxt(path, delimiter=",", comments="#", dtype=np.float64, ndmin=2, encoding="utf-8")
+    except ValueError as e:
+        raise ValueError(f"Invalid line in coords file: {e}") from e
+    if arr.size == 0:
+        return []
+    if arr.shape[1] != 2:
+        raise ValueError(f"Invalid coords file '{path}': expected 2 columns 'lat,lon', got {arr.shape[1]}")
+    bad = _out_of_range_rows(np, arr)
+    if bad is not None:
+        raise ValueError(_OUT_OF_RANGE.format(f"{arr[bad, 0]},{arr[bad, 1]}"))
+    return list(map(tuple, arr.tolist()))
+
+
+_OUT_OF_RANGE = "Coordinate '{}' out of range. Expected -90<=lat<=90 and -180<=lon<=180."
+
+
+def _in_range(latitude: float, longitude: float) -> bool:
+    # Chained comparisons are False for NaN, so NaN is rejected too
+    return -90 <= latitude <= 90 and -180 <= longitude <= 180
+
+
+def _out_of_range_rows(np: Any, arr: Any) -> Optional[int]:
+    """Index of the first (lat, lon) row outside valid bounds (or NaN), else None."""
+    bad = ~((np.abs(arr[:, 0]) <= 90) & (np.abs(arr[:, 1]) <= 180))
+    return int(np.argmax(bad)) if bad.any() else None
+
+
+# CSV columns: every normalized field, without the raw payload
+_CSV_FIELDS = (
+    "provider",
+    "latitude",
+    "longitude",
+    "observed_at_unix",
+    "temperature_c",
+    "temperature_f",
+    "humidity_pct",
+    "pressure_hpa",
+    "wind_speed_ms",
+    "wind_direction_deg",
+    "condition_code",
+    "condition_text",
+)
+_CSV_ROW = operator.attrgetter(*_CSV_FIELDS)
+
+
+def to_serializable(reading: WeatherReading) -> Dict[str, Any]:
+    record = reading._asdict()
+    if not record["raw"]:
+        del record["raw"]
+    return record
+
+
+def fetch_many(
+    client: Any,
+    coords: List[Tuple[float, float]],
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> List[WeatherReading]:
+    """Fetch current weather for every coordinate, in input order.
+
+    Clients with ``fetch_current_batch`` get the whole list at once. Otherwise
+    a single coordinate goes through the client's blocking session; anything
+    more fans out over the process-wide async session (aiohttp, or httpx over
+    HTTP/2 with WEATHER_HTTP2=1) with at most ``concurrency`` requests in
+    flight; 429/5xx responses are retried with backoff. The
+    first provider error is re-raised. Repeated coordinates are fetched once.
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+    unique = list(dict.fromkeys(coords))
+    if len(unique) < len(coords):
+        lookup = dict(zip(unique, fetch_many(client, unique, concurrency)))
+        return [lookup[c] for c in coords]
+    fetch_batch = getattr(client, "fetch_current_batch", None)
+    if fetch_batch is not None:
+        return fetch_batch(coords)
+    if len(coords) <= 1:
+        return [client.fetch_current(lat, lon) for (lat, lon) in coords]
+    return _async_runner().run(lambda session: _gather(client, coords, concurrency, session))
+
+
+async def _gather(
+    client: Any,
+    coords: List[Tuple[float, float]],
+    concurrency: int,
+    session: AsyncSession,
+) -> List[WeatherReading]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_one(session: AsyncSession, lat: float, lon: float) -> WeatherReading:
+        async with semaphore:
+            return await client.fetch_current_async(session, lat, lon)
+
+    results = await asyncio.gather(
+        *[fetch_one(session, lat, lon) for (lat, lon) in coords],
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return list(results)
+
+
+def _async_session() -> AsyncSession:
+    if HTTP2:
+        try:
+            import httpx
+
+            return httpx.AsyncClient(
+                http2=True,
+                timeout=20,
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+            )
+        except ImportError:  # pragma: no cover - httpx or its h2 extra is missing
+            pass
+    return aiohttp.ClientSession()
+
+
+class _AsyncRunner:
+    """Event loop on a daemon thread that owns one long-lived async HTTP session.
+
+    fetch_many calls from any thread (CLI or Django workers) run their
+    coroutines here, so pooled connections and TLS sessions are reused across
+    calls instead of being rebuilt for every fan-out.
+    """
+
+    def __init__(self) -> None:
+        self.pid = os.getpid()
+        self._session: Optional[AsyncSession] = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="weather-async", daemon=True)
+        self._thread.start()
+
+    def run(self, coro_fn: Any) -> Any:
+        """Run ``coro_fn(session)`` on the loop and block until it finishes."""
+        return asyncio.run_coroutine_threadsafe(self._with_session(coro_fn), self._loop).result()
+
+    def submit(self, coro_fn: Any) -> None:
+        """Schedule ``coro_fn(session)`` on the loop without waiting for it."""
+        asyncio.run_coroutine_threadsafe(self._with_session(coro_fn), self._loop)
+
+    async def _with_session(self, coro_fn: Any) -> Any:
+        # Only ever touched from the loop thread, so no lock is needed
+        if self._session is None:
+            self._session = _async_session()
+        return await coro_fn(self._session)
+
+    def close(self) -> None:
+        if self.pid != os.getpid():
+            return  # inherited through fork; the loop thread only exists in the parent
+
+        async def close_session() -> None:
+            if isinstance(self._session, aiohttp.ClientSession):
+                await self._session.close()
+            elif self._session is not None:
+                await self._session.aclose()
+
+        try:
+            asyncio.run_coroutine_threadsafe(close_session(), self._loop).result(timeout=5)
+        except Exception:  # pragma: no cover - best effort at interpreter exit
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def _async_runner() -> _AsyncRunner:
+    """Return this process's runner, starting a fresh one after a fork."""
+    global _ASYNC_RUNNER
+    with _ASYNC_RUNNER_LOCK:
+        if _ASYNC_RUNNER is None or _ASYNC_RUNNER.pid != os.getpid():
+            _ASYNC_RUNNER = _AsyncRunner()
+            atexit.register(_ASYNC_RUNNER.close)
+        return _ASYNC_RUNNER
+
+
+def write_output(
+    readings: List[WeatherReading],
+    fmt: str,
+    output_path: Optional[str],
+) -> None:
+    if fmt not in ("json", "csv"):
+        raise ValueError(f"Unsupported format: {fmt}")
+    dest = open(output_path, "w", newline="", encoding="utf-8") if output_path else sys.stdout
+    try:
+        if fmt == "json":
+            _write_json(readings, dest)
+        else:
+            _write_csv(readings, dest)
+    finally:
+        if dest is not sys.stdout:
+            dest.close()
+
+
+def _write_json(readings: List[WeatherReading], dest: Any) -> None:
+    # Serialize one reading at a time instead of materializing the whole array
+    dest.write("[")
+    for idx, reading in enumerate(readings):
+        item = _json_dumps_pretty(to_serializable(reading)).replace("\n", "\n  ")
+        dest.write(("\n  " if idx == 0 else ",\n  ") + item)
+    dest.write("\n]\n" if readings else "]\n")
+
+
+def _write_csv(readings: List[WeatherReading], dest: Any) -> None:
+    writer = csv.writer(dest)
+    writer.writerow(_CSV_FIELDS)
+    writer.writerows(_CSV_ROW(r) for r in readings)
+
+
+def _positive_int(value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Download weather for coordinates")
+    parser.add_argument(
+        "--provider",
+        required=True,
+        choices=["openweather", "accuweather", "weatherapi", "openmeteo"],
+        help="Weather provider to use",
+    )
+    parser.add_argument(
+        "--coords",
+        nargs="*",
+        default=[],
+        help="List of 'lat,lon' pairs. If omitted, uses sample coords.",
+    )
+    parser.add_argument(
+        "--coords-file",
+        default=None,
+        help="Path to a text file with one 'lat,lon' per line (supports # comments)",
+    )
+    parser.add_argument(
+        "--format",
+        default="json",
+        choices=["json", "csv"],
+        help="Output format",
+    )
+    parser.add_argument(
+        "--out",
+        default=None,
+        help="Output file path. If omitted, prints to stdout.",
+    )
+    parser.add_argument(
+        "--openweather-api-key",
+        default=os.getenv("OPENWEATHER_API_KEY"),
+        help="Override OpenWeather API key (or set OPENWEATHER_API_KEY)",
+    )
+    parser.add_argument(
+        "--accuweather-api-key",
+        default=os.getenv("ACCUWEATHER_API_KEY"),
+        help="Override AccuWeather API key (or set ACCUWEATHER_API_KEY)",
+    )
+    parser.add_argument(
+        "--weatherapi-api-key",
+        default=os.getenv("WEATHERAPI_API_KEY"),
+        help="Override WeatherAPI API key (or set WEATHERAPI_API_KEY)",
+    )
+    parser.add_argument(
+        "--keep-raw",
+        action=argparse.BooleanOptionalAction,
+        default=KEEP_RAW_DEFAULT,
+        help="Include the full provider payload as 'raw' in JSON output (default from WEATHER_KEEP_RAW=1)",
+    )
+    parser.add_argument(
+        "--delay-seconds",
+        type=float,
+        default=0.0,
+        help="Optional delay between requests to avoid rate limits (disables concurrent fetching)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=_positive_int,
+        default=DEFAULT_CONCURRENCY,
+        help="Maximum number of requests in flight when fetching many coords",
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+
+    coords: List[Tuple[float, float]]
+    if args.coords_file:
+        coords = parse_coords_file(args.coords_file)
+    else:
+        coords = parse_coords(args.coords) if args.coords else DEFAULT_SAMPLE_COORDS
+
+    if args.provider == "openweather":
+        client = OpenWeatherClient(api_key=args.openweather_api_key, keep_raw=args.keep_raw)
+    elif args.provider == "accuweather":
+        client = AccuWeatherClient(api_key=args.accuweather_api_key, keep_raw=args.keep_raw)
+    elif args.provider == "weatherapi":
+        client = WeatherAPIClient(api_key=args.weatherapi_api_key, keep_raw=args.keep_raw)
+    elif args.provider == "openmeteo":
+        client = OpenMeteoClient(keep_raw=args.keep_raw)
+    else:
+        parser.error("Unsupported provider")
+        return 2
+
+    readings: List[WeatherReading] = []
+    if args.delay_seconds:
+        unique = list(dict.fromkeys(coords))
+        lookup: Dict[Tuple[float, float], WeatherReading] = {}
+        for idx, (lat, lon) in enumerate(unique):
+            lookup[(lat, lon)] = client.fetch_current(lat, lon)
+            if idx < len(unique) - 1:
+                time.sleep(args.delay_seconds)
+        readings = [lookup[c] for c in coords]
+    else:
+        readings = fetch_many(client, coords, concurrency=args.concurrency)
+
+    write_output(readings, args.format, args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())